@@ -0,0 +1,17 @@
+"""
+Celery configuration for image_extractor project.
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'image_extractor.settings')
+
+app = Celery('image_extractor')
+
+# Read CELERY_* settings from the Django settings module
+app.config_from_object('django.conf:settings', namespace='CELERY')
+
+# Load tasks.py modules from all installed apps
+app.autodiscover_tasks()
@@ -18,6 +18,7 @@ ALLOWED_HOSTS = ['localhost', '127.0.0.1', '0.0.0.0']
 
 # Application definition
 INSTALLED_APPS = [
+    'daphne',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -26,6 +27,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'corsheaders',
+    'channels',
     'image_processing',
 ]
 
@@ -59,6 +61,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'image_extractor.wsgi.application'
+ASGI_APPLICATION = 'image_extractor.asgi.application'
 
 # Database
 DATABASES = {
@@ -107,8 +110,61 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 CORS_ALLOW_ALL_ORIGINS = True
 
 # File upload settings
-FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
+# Larger uploads are streamed to a temporary file instead of being buffered in memory
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2621440  # 2.5MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024  # 10MB
+# Spooled uploads go to the system temp dir unless pointed at scratch space such as a tmpfs
+FILE_UPLOAD_TEMP_DIR = os.environ.get('FILE_UPLOAD_TEMP_DIR')
+
+# Celery settings
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', CELERY_BROKER_URL)
+CELERY_TASK_ALWAYS_EAGER = os.environ.get('CELERY_TASK_ALWAYS_EAGER', 'False') == 'True'
+CELERY_TASK_SERIALIZER = 'json'
+CELERY_RESULT_SERIALIZER = 'json'
+CELERY_ACCEPT_CONTENT = ['json']
+CELERY_TASK_ACKS_LATE = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+# Report running tasks as STARTED, so re-uploads can tell them apart from queued or lost ones
+CELERY_TASK_TRACK_STARTED = True
+# OCR is CPU bound while background removal benefits from a GPU, so each gets its own queue
+CELERY_TASK_ROUTES = {
+    'image_processing.tasks.extract_text_task': {'queue': 'ocr'},
+    'image_processing.tasks.remove_background_task': {'queue': 'bgremove'},
+}
+
+# Images whose tasks are still pending after this many seconds are assumed lost and are
+# queued again on re-upload; keep it above the longest expected queue backlog
+PROCESSING_STALE_SECONDS = int(os.environ.get('PROCESSING_STALE_SECONDS', 3600))
+
+# Channels settings
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels_redis.core.RedisChannelLayer',
+        'CONFIG': {
+            'hosts': [os.environ.get('CHANNEL_REDIS_URL', 'redis://localhost:6379/1')],
+        },
+    },
+}
+
+# Logging; progress messages are only written while debugging
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'image_processing': {
+            'handlers': ['console'],
+            'level': 'INFO' if DEBUG else 'WARNING',
+        },
+    },
+}
 
 # Tesseract path (update this based on your system)
 TESSERACT_CMD = r'C:\Program Files\Tesseract-OCR\tesseract.exe'  # Windows path
@@ -1,121 +1,451 @@
 """
 ML/LLM based product attribute extraction
 """
+import copy
+import hashlib
 import json
+import queue
 import re
-from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+from functools import cached_property, lru_cache
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
 import torch
 from typing import Dict, List, Any
 
+try:
+    # google-re2 matches in guaranteed linear time, which matters on long noisy OCR text
+    import re2 as regex_engine
+except ImportError:
+    regex_engine = re
+
+# google-re2 has no flag constants, so case-insensitivity is set inline in every pattern
+_IGNORECASE = '(?i)'
+
+
+class _OrderedPatterns:
+    """Alternative patterns tried in priority order, earlier patterns winning over later ones"""
+    
+    def __init__(self, patterns):
+        self.regexes = [regex_engine.compile(_IGNORECASE + pattern) for pattern in patterns]
+    
+    def search(self, text):
+        """Return the first match of the highest priority pattern that matches, or None"""
+        for regex in self.regexes:
+            match = regex.search(text)
+            if match:
+                # Same shape as re.findall: whole match, single group or tuple of groups
+                groups = match.groups()
+                if not groups:
+                    return match.group(0)
+                return groups[0] if len(groups) == 1 else groups
+        return None
+
+
+# Regex patterns are compiled once at import time instead of on every call
+_PRICE_PATTERNS = _OrderedPatterns([
+    r'\$[\d,]+\.?\d*',
+    r'USD\s*[\d,]+\.?\d*',
+    r'Price:\s*[\d,]+\.?\d*',
+    r'Cost:\s*[\d,]+\.?\d*',
+])
+
+_DIMENSION_PATTERNS = _OrderedPatterns([
+    r'(\d+(?:\.\d+)?)\s*x\s*(\d+(?:\.\d+)?)\s*x\s*(\d+(?:\.\d+)?)',
+    r'(\d+(?:\.\d+)?)\s*cm\s*x\s*(\d+(?:\.\d+)?)\s*cm',
+    r'(\d+(?:\.\d+)?)\s*inch\s*x\s*(\d+(?:\.\d+)?)\s*inch',
+    r'Size:\s*(\d+(?:\.\d+)?)\s*x\s*(\d+(?:\.\d+)?)',
+])
+
+_WEIGHT_PATTERNS = _OrderedPatterns([
+    r'(\d+(?:\.\d+)?)\s*kg',
+    r'(\d+(?:\.\d+)?)\s*lb',
+    r'Weight:\s*(\d+(?:\.\d+)?)\s*kg',
+    r'Weight:\s*(\d+(?:\.\d+)?)\s*lb',
+])
+
+_BRAND_PATTERNS = _OrderedPatterns([
+    r'Brand:\s*([A-Za-z0-9\s]+)',
+    r'Manufacturer:\s*([A-Za-z0-9\s]+)',
+    r'Made by:\s*([A-Za-z0-9\s]+)',
+])
+
+_RESOLUTION_PATTERNS = [
+    regex_engine.compile(_IGNORECASE + pattern) for pattern in (
+        r'(\d+)\s*x\s*(\d+)\s*pixels',
+        r'(\d+)\s*x\s*(\d+)\s*resolution',
+        r'(\d+)\s*MP',
+        r'(\d+)\s*megapixel',
+    )
+]
+
+_STORAGE_PATTERNS = [
+    regex_engine.compile(_IGNORECASE + pattern) for pattern in (
+        r'(\d+)\s*GB',
+        r'(\d+)\s*TB',
+        r'(\d+)\s*MB',
+        r'Storage:\s*(\d+)\s*GB',
+    )
+]
+
+_COLOR_KEYWORDS = (
+    'red', 'blue', 'green', 'yellow', 'black', 'white', 'gray', 'grey',
+    'brown', 'purple', 'pink', 'orange', 'silver', 'gold', 'bronze'
+)
+
+_MATERIAL_KEYWORDS = (
+    'wood', 'metal', 'plastic', 'glass', 'fabric', 'leather', 'cotton',
+    'steel', 'aluminum', 'ceramic', 'rubber', 'silk', 'wool', 'nylon'
+)
+
+_FEATURE_KEYWORDS = (
+    'waterproof', 'durable', 'lightweight', 'portable', 'adjustable',
+    'rechargeable', 'wireless', 'bluetooth', 'wifi', 'usb', 'hdmi',
+    'touchscreen', 'backlit', 'ergonomic', 'antimicrobial', 'stainless'
+)
+
+
+# Keyword -> attribute name lookup covering every keyword vocabulary
+_KEYWORD_CATEGORIES = {
+    keyword: category
+    for category, keywords in (
+        ('colors', _COLOR_KEYWORDS),
+        ('materials', _MATERIAL_KEYWORDS),
+        ('features', _FEATURE_KEYWORDS),
+    )
+    for keyword in keywords
+}
+
+# Every keyword is a single word, so a whole-word match is exactly a token lookup
+_WORD_RE = re.compile(r'\w+')
+
+
+# Whitespace-separated words longer than 3 characters
+_KEYWORD_TOKEN_RE = re.compile(r'\S{4,}')
+
+
+def _top_keywords(text, count):
+    """Return the most frequent words longer than 3 characters, most frequent first"""
+    # Tokenizing, filtering and counting all run in C, with no per-word Python code
+    word_freq = Counter(_KEYWORD_TOKEN_RE.findall(text.lower()))
+    return [word for word, freq in word_freq.most_common(count)]
+
+
+@lru_cache(maxsize=32)
+def _match_keywords(text):
+    """Scan the text once and bucket every known keyword by attribute name"""
+    buckets = {category: [] for category in set(_KEYWORD_CATEGORIES.values())}
+    for word in _WORD_RE.findall(text.lower()):
+        category = _KEYWORD_CATEGORIES.get(word)
+        if category and word not in buckets[category]:
+            buckets[category].append(word)
+    return {category: tuple(found) for category, found in buckets.items()}
+
+
+# Small distilled NLI model (~66M parameters) used for zero-shot product categorization
+_CLASSIFIER_MODEL = "typeform/distilbert-base-uncased-mnli"
+
+# After the model fails to load, requests fail fast for this many seconds before it is retried
+_MODEL_RETRY_DELAY = 60
+
+# Zero-shot categorization scores "<text>" entailing "This product is <category>."
+_HYPOTHESIS_TEMPLATE = "This product is {}."
+
+# Fixed input length in tokens for (text, hypothesis) pairs
+_CLASSIFIER_MAX_LENGTH = 128
+
+_PRODUCT_CATEGORIES = (
+    'Electronics', 'Clothing', 'Footwear', 'Furniture', 'Home & Kitchen', 'Beauty',
+    'Sports & Outdoors', 'Toys', 'Books', 'Automotive', 'Jewelry', 'Grocery'
+)
+
+
+# Concurrent classifier calls are coalesced into batches of up to this many texts,
+# waiting at most this many seconds for a batch to fill
+_CLASSIFIER_BATCH_SIZE = 16
+_CLASSIFIER_BATCH_WAIT = 0.01
+
+# Longest a request waits for its categorization, including a cold model load, in seconds
+_CLASSIFIER_TIMEOUT = 60
+
+
+class _MicroBatcher:
+    """Coalesce concurrent single-item calls into batched calls on a background thread"""
+    
+    def __init__(self, batch_fn, max_batch_size, max_wait):
+        self._batch_fn = batch_fn
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._worker.start()
+    
+    def submit(self, item):
+        """Queue an item and return a Future resolved with its result"""
+        future = Future()
+        self._queue.put((item, future))
+        return future
+    
+    def _next_batch(self):
+        """Block for one item, then collect more until the batch is full or the wait expires"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self._max_wait
+        while len(batch) < self._max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+    
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                results = self._batch_fn([item for item, _ in batch])
+                # zip() would silently leave the futures past a short result list unresolved
+                if len(results) != len(batch):
+                    raise RuntimeError(f"Batch function returned {len(results)} results for {len(batch)} items")
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+
+
+# Number of recent extraction results and near-duplicate categorizations to keep
+_ATTRIBUTE_CACHE_SIZE = 1024
+_CATEGORY_CACHE_SIZE = 2048
+
+# Texts whose 64-bit simhashes differ in at most this many bits count as near-duplicates.
+# The signature is split into one more band than that, so near-duplicates always share a band
+_SIMHASH_MAX_DISTANCE = 3
+_SIMHASH_BANDS = _SIMHASH_MAX_DISTANCE + 1
+
+
+def _simhash(text):
+    """Return the 64-bit simhash of the set of words in the text, or None if it has no words"""
+    words = set(_WORD_RE.findall(text.lower()))
+    if not words:
+        return None
+    weights = [0] * 64
+    for word in words:
+        word_hash = int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), 'big')
+        for bit in range(64):
+            weights[bit] += 1 if word_hash >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+class _LRUCache:
+    """Thread-safe mapping that evicts its least recently used entries"""
+    
+    def __init__(self, maxsize):
+        self._maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+    
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class _SimilarityCache:
+    """LRU cache looked up by simhash, returning values stored for near-duplicate texts"""
+    
+    def __init__(self, maxsize):
+        self._entries = _LRUCache(maxsize)
+    
+    def _band_keys(self, signature):
+        band_bits = 64 // _SIMHASH_BANDS
+        mask = (1 << band_bits) - 1
+        return [(band, signature >> (band * band_bits) & mask) for band in range(_SIMHASH_BANDS)]
+    
+    def get(self, signature):
+        for band_key in self._band_keys(signature):
+            entry = self._entries.get(band_key)
+            if entry is not None and bin(entry[0] ^ signature).count('1') <= _SIMHASH_MAX_DISTANCE:
+                return entry[1]
+        return None
+    
+    def put(self, signature, value):
+        for band_key in self._band_keys(signature):
+            self._entries.put(band_key, (signature, value))
+    
+    def clear(self):
+        self._entries.clear()
+
 
 class ProductAttributeExtractor:
     """Class for extracting product attributes using ML/LLM models"""
     
     def __init__(self):
-        # Initialize text classification pipeline for product categorization
-        self.classifier = pipeline(
-            "text-classification",
-            model="microsoft/DialoGPT-medium",
-            return_all_scores=True
-        )
+        # Full results of recent extractions keyed on a fingerprint of their input
+        self._attribute_cache = _LRUCache(_ATTRIBUTE_CACHE_SIZE)
         
-        # Initialize tokenizer for text processing
-        self.tokenizer = AutoTokenizer.from_pretrained("microsoft/DialoGPT-medium")
+        # Categories of recent texts, reused for near-duplicate OCR output
+        self._category_cache = _SimilarityCache(_CATEGORY_CACHE_SIZE)
+        
+        # Tokenizer and classifier, loaded once by whichever thread needs them first
+        self._model_lock = threading.Lock()
+        self._model = None
+        self._model_error = None
+        self._model_failed_at = 0.0
+    
+    def clear_cache(self):
+        """Forget cached results, e.g. after the classifier model has been replaced"""
+        self._attribute_cache.clear()
+        self._category_cache.clear()
+    
+    @cached_property
+    def _device(self):
+        """Device the classifier runs on"""
+        return torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    
+    def _build_classifier(self):
+        """Load the NLI model, compiled for the GPU when one is available"""
+        model = AutoModelForSequenceClassification.from_pretrained(_CLASSIFIER_MODEL).eval()
+        if self._device.type == 'cuda':
+            # Half precision halves activation bandwidth and TorchInductor fuses the kernels;
+            # _classify_batch pads inputs to a few fixed shapes so graphs are not rebuilt per call
+            model = torch.compile(model.to(self._device).half(), mode='reduce-overhead')
+        return model
+    
+    def _load_model(self):
+        """Return the tokenizer and classifier, loading them on first use"""
+        if self._model is not None:
+            return self._model
+        # cached_property does not lock, so concurrent first requests would each load the model
+        with self._model_lock:
+            if self._model is None:
+                if self._model_error is not None and time.monotonic() - self._model_failed_at < _MODEL_RETRY_DELAY:
+                    raise RuntimeError(f"Classifier failed to load recently: {self._model_error}")
+                try:
+                    self._model = (AutoTokenizer.from_pretrained(_CLASSIFIER_MODEL), self._build_classifier())
+                except Exception as e:
+                    self._model_error = e
+                    self._model_failed_at = time.monotonic()
+                    raise
+                self._model_error = None
+            return self._model
+    
+    @property
+    def classifier(self):
+        """NLI model used for zero-shot product categorization, loaded on first use"""
+        return self._load_model()[1]
+    
+    @cached_property
+    def _entailment_index(self):
+        """Index of the entailment logit in the classifier output"""
+        return next(
+            index for label, index in self.classifier.config.label2id.items()
+            if label.lower().startswith('entail')
+        )
+    
+    @property
+    def tokenizer(self):
+        """Tokenizer for text processing, loaded on first use"""
+        return self._load_model()[0]
+    
+    @cached_property
+    def _classifier_batcher(self):
+        """Micro-batcher that groups concurrent categorization requests into one model call"""
+        return _MicroBatcher(self._classify_batch, _CLASSIFIER_BATCH_SIZE, _CLASSIFIER_BATCH_WAIT)
+    
+    def warm(self):
+        """Load the tokenizer and classifier now instead of on the first extraction"""
+        self._load_model()
+    
+    def _classify_batch(self, texts):
+        """Categorize several texts with a single forward pass over every (text, category) pair"""
+        labels = _PRODUCT_CATEGORIES
+        count = len(texts)
+        compiled = self._device.type == 'cuda'
+        if compiled:
+            # The compiled graph is specialized on input shapes, so pad the batch to a power
+            # of two number of texts and every pair to the same length; that bounds the
+            # number of graphs to one per batch size bucket
+            texts = list(texts) + [''] * ((1 << (count - 1).bit_length()) - count)
+        premises = [text for text in texts for _ in labels]
+        hypotheses = [_HYPOTHESIS_TEMPLATE.format(label) for _ in texts for label in labels]
+        inputs = self.tokenizer(
+            premises,
+            hypotheses,
+            # Uncompiled models only need padding to the longest pair in the batch
+            padding='max_length' if compiled else True,
+            truncation='only_first',
+            max_length=_CLASSIFIER_MAX_LENGTH,
+            return_tensors='pt'
+        ).to(self._device)
+        
+        with torch.inference_mode():
+            logits = self.classifier(**inputs).logits
+        
+        # Softmax the entailment logits over the candidate categories of each text
+        scores = logits[:, self._entailment_index].float().view(len(texts), len(labels))[:count].softmax(dim=-1)
+        
+        results = []
+        for text_scores in scores.tolist():
+            ranked = sorted(zip(labels, text_scores), key=lambda item: item[1], reverse=True)
+            results.append({
+                'labels': [label for label, score in ranked],
+                'scores': [score for label, score in ranked],
+            })
+        return results
     
     def extract_basic_attributes(self, text: str) -> Dict[str, Any]:
         """Extract basic attributes using regex patterns"""
         attributes = {}
         
         # Extract price information
-        price_patterns = [
-            r'\$[\d,]+\.?\d*',
-            r'USD\s*[\d,]+\.?\d*',
-            r'Price:\s*[\d,]+\.?\d*',
-            r'Cost:\s*[\d,]+\.?\d*'
-        ]
-        
-        prices = []
-        for pattern in price_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            prices.extend(matches)
-        
-        if prices:
-            attributes['price'] = prices[0]
+        price = _PRICE_PATTERNS.search(text)
+        if price:
+            attributes['price'] = price
         
         # Extract dimensions
-        dimension_patterns = [
-            r'(\d+(?:\.\d+)?)\s*x\s*(\d+(?:\.\d+)?)\s*x\s*(\d+(?:\.\d+)?)',
-            r'(\d+(?:\.\d+)?)\s*cm\s*x\s*(\d+(?:\.\d+)?)\s*cm',
-            r'(\d+(?:\.\d+)?)\s*inch\s*x\s*(\d+(?:\.\d+)?)\s*inch',
-            r'Size:\s*(\d+(?:\.\d+)?)\s*x\s*(\d+(?:\.\d+)?)'
-        ]
-        
-        dimensions = []
-        for pattern in dimension_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            dimensions.extend(matches)
-        
+        dimensions = _DIMENSION_PATTERNS.search(text)
         if dimensions:
-            attributes['dimensions'] = dimensions[0]
+            attributes['dimensions'] = dimensions
         
         # Extract weight
-        weight_patterns = [
-            r'(\d+(?:\.\d+)?)\s*kg',
-            r'(\d+(?:\.\d+)?)\s*lb',
-            r'Weight:\s*(\d+(?:\.\d+)?)\s*kg',
-            r'Weight:\s*(\d+(?:\.\d+)?)\s*lb'
-        ]
-        
-        weights = []
-        for pattern in weight_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            weights.extend(matches)
-        
-        if weights:
-            attributes['weight'] = weights[0]
+        weight = _WEIGHT_PATTERNS.search(text)
+        if weight:
+            attributes['weight'] = weight
         
         # Extract color information
-        color_keywords = [
-            'red', 'blue', 'green', 'yellow', 'black', 'white', 'gray', 'grey',
-            'brown', 'purple', 'pink', 'orange', 'silver', 'gold', 'bronze'
-        ]
-        
-        colors = []
-        for color in color_keywords:
-            if re.search(rf'\b{color}\b', text, re.IGNORECASE):
-                colors.append(color)
+        colors = list(_match_keywords(text)['colors'])
         
         if colors:
             attributes['colors'] = colors
         
         # Extract material information
-        material_keywords = [
-            'wood', 'metal', 'plastic', 'glass', 'fabric', 'leather', 'cotton',
-            'steel', 'aluminum', 'ceramic', 'rubber', 'silk', 'wool', 'nylon'
-        ]
-        
-        materials = []
-        for material in material_keywords:
-            if re.search(rf'\b{material}\b', text, re.IGNORECASE):
-                materials.append(material)
+        materials = list(_match_keywords(text)['materials'])
         
         if materials:
             attributes['materials'] = materials
         
         # Extract brand information
-        brand_patterns = [
-            r'Brand:\s*([A-Za-z0-9\s]+)',
-            r'Manufacturer:\s*([A-Za-z0-9\s]+)',
-            r'Made by:\s*([A-Za-z0-9\s]+)'
-        ]
-        
-        brands = []
-        for pattern in brand_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            brands.extend(matches)
-        
-        if brands:
-            attributes['brand'] = brands[0].strip()
+        brand = _BRAND_PATTERNS.search(text)
+        if brand:
+            attributes['brand'] = brand.strip()
         
         return attributes
     
@@ -124,24 +454,20 @@ class ProductAttributeExtractor:
         attributes = {}
         
         try:
-            # Categorize the product
-            categories = self.classifier(text)
-            if categories:
-                attributes['category'] = categories[0]['label']
-                attributes['category_confidence'] = categories[0]['score']
+            # Categorize the product, reusing the result for near-duplicate text
+            signature = _simhash(text)
+            # Texts without words would all share one signature, so they skip the similarity cache
+            categories = self._category_cache.get(signature) if signature is not None else None
+            if categories is None:
+                categories = self._classifier_batcher.submit(text).result(timeout=_CLASSIFIER_TIMEOUT)
+                if signature is not None:
+                    self._category_cache.put(signature, categories)
+            if categories['labels']:
+                attributes['category'] = categories['labels'][0]
+                attributes['category_confidence'] = categories['scores'][0]
             
             # Extract key phrases using simple NLP
-            words = text.lower().split()
-            
-            # Count frequency of important words
-            word_freq = {}
-            for word in words:
-                if len(word) > 3:  # Only consider words longer than 3 characters
-                    word_freq[word] = word_freq.get(word, 0) + 1
-            
-            # Get most frequent words as keywords
-            keywords = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:10]
-            attributes['keywords'] = [word for word, freq in keywords]
+            attributes['keywords'] = _top_keywords(text, 10)
             
         except Exception as e:
             print(f"Error in ML attribute extraction: {e}")
@@ -153,16 +479,7 @@ class ProductAttributeExtractor:
         attributes = {}
         
         # Extract product features
-        feature_keywords = [
-            'waterproof', 'durable', 'lightweight', 'portable', 'adjustable',
-            'rechargeable', 'wireless', 'bluetooth', 'wifi', 'usb', 'hdmi',
-            'touchscreen', 'backlit', 'ergonomic', 'antimicrobial', 'stainless'
-        ]
-        
-        features = []
-        for feature in feature_keywords:
-            if re.search(rf'\b{feature}\b', text, re.IGNORECASE):
-                features.append(feature)
+        features = list(_match_keywords(text)['features'])
         
         if features:
             attributes['features'] = features
@@ -171,29 +488,15 @@ class ProductAttributeExtractor:
         tech_specs = {}
         
         # Extract resolution
-        resolution_patterns = [
-            r'(\d+)\s*x\s*(\d+)\s*pixels',
-            r'(\d+)\s*x\s*(\d+)\s*resolution',
-            r'(\d+)\s*MP',
-            r'(\d+)\s*megapixel'
-        ]
-        
-        for pattern in resolution_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _RESOLUTION_PATTERNS:
+            match = pattern.search(text)
             if match:
                 tech_specs['resolution'] = match.group(0)
                 break
         
         # Extract storage capacity
-        storage_patterns = [
-            r'(\d+)\s*GB',
-            r'(\d+)\s*TB',
-            r'(\d+)\s*MB',
-            r'Storage:\s*(\d+)\s*GB'
-        ]
-        
-        for pattern in storage_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _STORAGE_PATTERNS:
+            match = pattern.search(text)
             if match:
                 tech_specs['storage'] = match.group(0)
                 break
@@ -211,6 +514,14 @@ class ProductAttributeExtractor:
         if not combined_text:
             return {}
         
+        # Return a copy of the cached result for identical input
+        cache_key = hashlib.blake2b(
+            '\0'.join((title, description, image_path or '')).encode(), digest_size=16
+        ).digest()
+        cached_attributes = self._attribute_cache.get(cache_key)
+        if cached_attributes is not None:
+            return copy.deepcopy(cached_attributes)
+        
         # Extract different types of attributes
         basic_attrs = self.extract_basic_attributes(combined_text)
         ml_attrs = self.extract_ml_attributes(combined_text)
@@ -231,4 +542,14 @@ class ProductAttributeExtractor:
             'has_image': bool(image_path)
         }
         
+        # A missing category means the classifier failed; keep that result out of the cache
+        # so the text is categorized again once the model is available
+        if 'category' in ml_attrs:
+            self._attribute_cache.put(cache_key, copy.deepcopy(all_attributes))
         return all_attributes
+
+
+@lru_cache(maxsize=1)
+def get_attribute_extractor():
+    """Return the process-wide ProductAttributeExtractor so models are loaded once per worker"""
+    return ProductAttributeExtractor()
@@ -1,52 +1,179 @@
 """
 Background removal utilities using AI models
 """
+import hashlib
 import os
+import tempfile
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 import numpy as np
 from PIL import Image
 import cv2
+import onnxruntime as ort
+from onnxruntime.quantization import QuantType, quantize_dynamic
 from rembg import remove, new_session
+from rembg.sessions import sessions_class
 import torch
 
 
+# Prefer CUDA when onnxruntime-gpu is installed, otherwise run on the CPU
+_ORT_PROVIDERS = [
+    provider for provider in ('CUDAExecutionProvider', 'CPUExecutionProvider')
+    if provider in ort.get_available_providers()
+]
+
+# GrabCut runs on images downscaled to this longest side, for this many iterations,
+# and keeps this many recent masks
+_GRABCUT_MAX_SIDE = 512
+_GRABCUT_ITERATIONS = 2
+_GRABCUT_CACHE_SIZE = 32
+
+# U2-Net input size and ImageNet normalization, matching rembg's preprocessing
+_U2NET_INPUT_SIZE = (320, 320)
+_IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+_IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+
+def _read_image(image_path):
+    """Read an image as a BGR array, using PIL for formats OpenCV cannot decode such as GIF"""
+    img = cv2.imread(image_path)
+    if img is None:
+        with Image.open(image_path) as pil_img:
+            img = cv2.cvtColor(np.asarray(pil_img.convert('RGB')), cv2.COLOR_RGB2BGR)
+    return img
+
+
+def _model_path(model_name):
+    """Return the local path of a rembg ONNX model, downloading it if needed"""
+    session_class = next(sc for sc in sessions_class if sc.name() == model_name)
+    return session_class.download_models()
+
+
+def _quantize_model(model_path, quantized_path):
+    """Write an INT8-quantized copy of an ONNX model, replacing the target atomically"""
+    # Quantize into a temporary file next to the target, so other processes never load a partial model
+    fd, temp_path = tempfile.mkstemp(suffix='.onnx', dir=os.path.dirname(quantized_path))
+    os.close(fd)
+    try:
+        quantize_dynamic(model_path, temp_path, weight_type=QuantType.QUInt8)
+        os.replace(temp_path, quantized_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
 class BackgroundRemover:
     """Class for removing backgrounds from images using AI models"""
     
     def __init__(self):
-        # Initialize rembg session with different models
-        self.models = {
-            'u2net': new_session('u2net'),
-            'u2netp': new_session('u2netp'),
-            'u2net_human_seg': new_session('u2net_human_seg'),
-            'u2net_cloth_seg': new_session('u2net_cloth_seg'),
-        }
+        # rembg sessions are created on first use of each model
+        # ('u2net', 'u2netp', 'u2net_human_seg', 'u2net_cloth_seg')
+        self._sessions = {}
+        self._quantized_sessions = {}
+        
+        # Recent GrabCut masks keyed on a hash of the downscaled image
+        self._grabcut_lock = threading.Lock()
+        self._grabcut_masks = OrderedDict()
+    
+    def _session(self, model_name):
+        """Return the rembg session for model_name, loading it on first use"""
+        session = self._sessions.get(model_name)
+        if session is None:
+            session = self._sessions[model_name] = new_session(model_name, providers=_ORT_PROVIDERS)
+        return session
+    
+    def warm(self, model_name='u2net'):
+        """Load the rembg session for a model now instead of on the first image"""
+        self._session(model_name)
+    
+    def _quantized_session(self, model_name):
+        """Return an ONNX Runtime session for an INT8-quantized copy of a rembg model"""
+        session = self._quantized_sessions.get(model_name)
+        if session is None:
+            model_path = str(_model_path(model_name))
+            quantized_path = model_path.replace('.onnx', '.int8.onnx')
+            if not os.path.exists(quantized_path):
+                _quantize_model(model_path, quantized_path)
+            
+            sess_options = ort.SessionOptions()
+            sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            session = self._quantized_sessions[model_name] = ort.InferenceSession(
+                quantized_path, sess_options, providers=_ORT_PROVIDERS
+            )
+        return session
+    
+    def remove_background_array(self, img, model_name='u2net'):
+        """Remove background from a BGR image array using rembg, returning a BGRA array"""
+        rgba = remove(cv2.cvtColor(img, cv2.COLOR_BGR2RGB), session=self._session(model_name))
+        return cv2.cvtColor(rgba, cv2.COLOR_RGBA2BGRA)
+    
+    def remove_background_bytes(self, data, model_name='u2net'):
+        """Remove background from encoded image bytes using rembg, returning PNG bytes"""
+        try:
+            # rembg decodes the bytes with PIL, which also reads formats OpenCV cannot such as GIF
+            return remove(data, session=self._session(model_name))
+        except Exception as e:
+            print(f"Error in background removal: {e}")
+            return None
     
     def remove_background_rembg(self, image_path, model_name='u2net'):
         """Remove background using rembg library"""
         try:
             # Load image
-            with open(image_path, 'rb') as input_file:
-                input_data = input_file.read()
+            img = _read_image(image_path)
             
             # Remove background
-            output_data = remove(input_data, session=self.models[model_name])
+            result = self.remove_background_array(img, model_name)
             
-            # Save result
-            output_path = image_path.replace('.', '_no_bg.')
-            with open(output_path, 'wb') as output_file:
-                output_file.write(output_data)
+            # Save result as PNG to keep transparency
+            output_path = os.path.splitext(image_path)[0] + '_no_bg.png'
+            cv2.imwrite(output_path, result)
             
             return output_path
         except Exception as e:
             print(f"Error in background removal: {e}")
             return None
     
+    def remove_background_onnx(self, image_path, model_name='u2net'):
+        """Remove background using an INT8-quantized U2-Net on ONNX Runtime"""
+        try:
+            # Read image
+            img = _read_image(image_path)
+            height, width = img.shape[:2]
+            
+            # Resize and normalize the input the same way rembg does
+            resized = cv2.resize(img, _U2NET_INPUT_SIZE, interpolation=cv2.INTER_AREA)
+            rgb = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB).astype(np.float32)
+            rgb /= max(float(rgb.max()), 1.0)
+            rgb -= _IMAGENET_MEAN
+            rgb /= _IMAGENET_STD
+            tensor = np.ascontiguousarray(rgb.transpose(2, 0, 1)[np.newaxis])
+            
+            # Predict the foreground probability map
+            session = self._quantized_session(model_name)
+            pred = session.run(None, {session.get_inputs()[0].name: tensor})[0][0, 0]
+            pred = (pred - pred.min()) / max(float(pred.max() - pred.min()), 1e-8)
+            
+            # Scale the mask back up and use it as the alpha channel
+            mask = cv2.resize((pred * 255).astype(np.uint8), (width, height), interpolation=cv2.INTER_LINEAR)
+            result = cv2.cvtColor(img, cv2.COLOR_BGR2BGRA)
+            result[:, :, 3] = mask
+            
+            # Save result as PNG to keep transparency
+            output_path = os.path.splitext(image_path)[0] + '_no_bg_onnx.png'
+            cv2.imwrite(output_path, result)
+            
+            return output_path
+        except Exception as e:
+            print(f"Error in ONNX background removal: {e}")
+            return None
+    
     def remove_background_opencv(self, image_path):
         """Remove background using OpenCV techniques"""
         try:
             # Read image
             img = cv2.imread(image_path)
-            original = img.copy()
             
             # Convert to HSV
             hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
@@ -56,11 +183,11 @@ class BackgroundRemover:
             upper_white = np.array([180, 30, 255])
             mask = cv2.inRange(hsv, lower_white, upper_white)
             
-            # Invert mask
-            mask_inv = cv2.bitwise_not(mask)
+            # Invert mask in place
+            cv2.bitwise_not(mask, dst=mask)
             
             # Apply mask
-            result = cv2.bitwise_and(original, original, mask=mask_inv)
+            result = cv2.bitwise_and(img, img, mask=mask)
             
             # Save result
             output_path = image_path.replace('.', '_no_bg_opencv.')
@@ -78,24 +205,22 @@ class BackgroundRemover:
             img = cv2.imread(image_path)
             height, width = img.shape[:2]
             
-            # Initialize mask
-            mask = np.zeros((height, width), np.uint8)
+            # Graph-cut cost grows with the pixel count, so segment a downscaled copy
+            scale = min(1.0, _GRABCUT_MAX_SIDE / max(height, width))
+            if scale < 1.0:
+                small = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            else:
+                small = img
             
-            # Define rectangle (assuming object is in center)
-            rect = (50, 50, width-100, height-100)
+            # Assume the object is in the center, 50 pixels in from the original borders
+            mask = self._grabcut_mask(small, margin=max(1, round(50 * scale)))
             
-            # Initialize background and foreground models
-            bgd_model = np.zeros((1, 65), np.float64)
-            fgd_model = np.zeros((1, 65), np.float64)
-            
-            # Apply GrabCut
-            cv2.grabCut(img, mask, rect, bgd_model, fgd_model, 5, cv2.GC_INIT_WITH_RECT)
-            
-            # Create final mask
-            mask2 = np.where((mask == 2) | (mask == 0), 0, 1).astype('uint8')
+            # Scale the mask back up to the original resolution
+            if scale < 1.0:
+                mask = cv2.resize(mask, (width, height), interpolation=cv2.INTER_NEAREST)
             
             # Apply mask
-            result = img * mask2[:, :, np.newaxis]
+            result = cv2.bitwise_and(img, img, mask=mask)
             
             # Save result
             output_path = image_path.replace('.', '_no_bg_grabcut.')
@@ -106,10 +231,48 @@ class BackgroundRemover:
             print(f"Error in GrabCut background removal: {e}")
             return None
     
+    def _grabcut_mask(self, img, margin):
+        """Return the GrabCut foreground mask of an image, reusing it for repeated images"""
+        digest = hashlib.blake2b(img.tobytes(), digest_size=16)
+        digest.update(repr((img.shape, margin)).encode())
+        key = digest.digest()
+        with self._grabcut_lock:
+            mask = self._grabcut_masks.get(key)
+            if mask is not None:
+                self._grabcut_masks.move_to_end(key)
+                return mask
+        
+        height, width = img.shape[:2]
+        
+        # Initialize mask
+        mask = np.zeros((height, width), np.uint8)
+        
+        # Define rectangle
+        rect = (margin, margin, width - 2 * margin, height - 2 * margin)
+        
+        # Initialize background and foreground models
+        bgd_model = np.zeros((1, 65), np.float64)
+        fgd_model = np.zeros((1, 65), np.float64)
+        
+        # Apply GrabCut
+        cv2.grabCut(img, mask, rect, bgd_model, fgd_model, _GRABCUT_ITERATIONS, cv2.GC_INIT_WITH_RECT)
+        
+        # Create final mask in place: definite (GC_FGD=1) and probable (GC_PR_FGD=3)
+        # foreground both have the low bit set, background (0 and 2) does not
+        np.bitwise_and(mask, 1, out=mask)
+        
+        with self._grabcut_lock:
+            self._grabcut_masks[key] = mask
+            if len(self._grabcut_masks) > _GRABCUT_CACHE_SIZE:
+                self._grabcut_masks.popitem(last=False)
+        return mask
+    
     def remove_background(self, image_path, method='rembg'):
         """Remove background using specified method"""
         if method == 'rembg':
             return self.remove_background_rembg(image_path)
+        elif method == 'onnx':
+            return self.remove_background_onnx(image_path)
         elif method == 'opencv':
             return self.remove_background_opencv(image_path)
         elif method == 'grabcut':
@@ -122,3 +285,9 @@ class BackgroundRemover:
                 if result:
                     results.append(result)
             return results[0] if results else None
+
+
+@lru_cache(maxsize=1)
+def get_background_remover():
+    """Return the process-wide BackgroundRemover so model sessions are reused across requests"""
+    return BackgroundRemover()
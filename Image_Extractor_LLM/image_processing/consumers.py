@@ -0,0 +1,24 @@
+"""
+WebSocket consumers for image processing updates
+"""
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+
+def image_group_name(image_id):
+    """Return the channel layer group that receives updates for an image"""
+    return f'image_{image_id}'
+
+
+class ImageStatusConsumer(AsyncJsonWebsocketConsumer):
+    """Notify a client when processing of an image has finished"""
+    
+    async def connect(self):
+        self.group_name = image_group_name(self.scope['url_route']['kwargs']['image_id'])
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+    
+    async def disconnect(self, code):
+        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+    
+    async def image_done(self, event):
+        await self.send_json({'image_id': event['image_id'], 'status': event['status']})
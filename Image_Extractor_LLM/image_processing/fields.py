@@ -0,0 +1,54 @@
+"""
+Custom model fields
+"""
+import json
+import msgpack
+import zstandard
+from django.db import models
+
+# Every value written by CompressedJSONField starts with the zstd frame magic number
+_ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+
+class CompressedJSONField(models.BinaryField):
+    """Field storing JSON-compatible values as zstd-compressed msgpack"""
+    
+    def __init__(self, *args, compression_level=3, **kwargs):
+        self.compression_level = compression_level
+        super().__init__(*args, **kwargs)
+    
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.compression_level != 3:
+            kwargs['compression_level'] = self.compression_level
+        return name, path, args, kwargs
+    
+    def _decode(self, value):
+        if isinstance(value, str):
+            # Rows written while the column was a JSONField hold plain JSON text
+            return json.loads(value)
+        data = bytes(value)
+        if not data.startswith(_ZSTD_MAGIC):
+            return json.loads(data)
+        data = zstandard.ZstdDecompressor().decompress(data)
+        return msgpack.unpackb(data, raw=False)
+    
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return self._decode(value)
+    
+    def to_python(self, value):
+        # Serialized fixtures store the value as plain JSON text
+        if isinstance(value, (str, bytes, bytearray, memoryview)):
+            return self._decode(value)
+        return value
+    
+    def get_prep_value(self, value):
+        if value is None:
+            return None
+        data = msgpack.packb(value, use_bin_type=True)
+        return zstandard.ZstdCompressor(level=self.compression_level).compress(data)
+    
+    def value_to_string(self, obj):
+        return json.dumps(self.value_from_object(obj))
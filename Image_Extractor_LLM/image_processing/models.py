@@ -1,17 +1,37 @@
 from django.db import models
 from django.utils import timezone
+from .fields import CompressedJSONField
 
 
 class ProcessedImage(models.Model):
     """Model to store processed image information"""
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_PROCESSING, 'Processing'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    
     original_image = models.ImageField(upload_to='original_images/')
     processed_image = models.ImageField(upload_to='processed_images/', null=True, blank=True)
     extracted_text = models.TextField(blank=True)
-    product_attributes = models.JSONField(default=dict, blank=True)
+    text_results = CompressedJSONField(default=dict, blank=True)
+    product_attributes = CompressedJSONField(default=dict, blank=True)
+    content_sha256 = models.CharField(max_length=64, null=True, blank=True, unique=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    queued_at = models.DateTimeField(null=True, blank=True)
+    task_id = models.CharField(max_length=255, blank=True)
     created_at = models.DateTimeField(default=timezone.now)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='processed_created_at_idx'),
+        ]
     
     def __str__(self):
         return f"ProcessedImage {self.id} - {self.original_image.name}"
@@ -0,0 +1,175 @@
+"""
+Background tasks for image processing
+"""
+import gc
+import os
+from asgiref.sync import async_to_sync
+from celery import Task, chord, shared_task
+from celery.signals import celeryd_after_setup, worker_process_init
+from celery.utils import uuid
+from channels.layers import get_channel_layer
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from .models import ProcessedImage
+from .consumers import image_group_name
+from .text_extractor import get_text_extractor
+from .background_remover import get_background_remover
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class _ImageTask(Task):
+    """Task that collects garbage after running, so decoded image buffers are not kept between tasks"""
+    
+    def after_return(self, *args, **kwargs):
+        # Image arrays can stay alive in reference cycles through exceptions and futures
+        gc.collect()
+
+
+# Queues this worker consumes, recorded in the main process before the pool is forked
+_worker_queues = set()
+
+
+def _warm_extractors():
+    """Load the models needed by the queues this worker consumes"""
+    if 'ocr' in _worker_queues:
+        get_text_extractor()
+    if 'bgremove' in _worker_queues:
+        get_background_remover().warm()
+
+
+@celeryd_after_setup.connect
+def _on_worker_setup(sender, instance, **kwargs):
+    _worker_queues.update(instance.app.amqp.queues.consume_from)
+    # The solo pool runs tasks in this process, other pools warm up in each child process
+    if 'solo' in getattr(instance.pool_cls, '__module__', str(instance.pool_cls)):
+        _warm_extractors()
+
+
+@worker_process_init.connect
+def _on_worker_process_init(**kwargs):
+    _warm_extractors()
+
+
+def _read_original(processed_image):
+    """Read the uploaded image bytes from storage"""
+    with processed_image.original_image.open('rb') as f:
+        return f.read()
+
+
+def _notify_done(image_id, status):
+    """Tell WebSocket clients watching an image that its processing has finished"""
+    try:
+        async_to_sync(get_channel_layer().group_send)(
+            image_group_name(image_id),
+            {'type': 'image.done', 'image_id': image_id, 'status': status}
+        )
+    except Exception as e:
+        # Clients also check the status endpoint, so they still see the result
+        logger.error("Error notifying clients for image %s: %s", image_id, e)
+
+
+def _drop_page_cache(field_file):
+    """Ask the kernel to evict a stored file from the page cache once it has been processed"""
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    try:
+        fd = os.open(field_file.path, os.O_RDONLY)
+    except (NotImplementedError, OSError):
+        # Remote storages have no local path
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def _mark_failed(image_id):
+    ProcessedImage.objects.filter(id=image_id).update(status=ProcessedImage.STATUS_FAILED)
+    _notify_done(image_id, ProcessedImage.STATUS_FAILED)
+
+
+@shared_task(base=_ImageTask)
+def extract_text_task(image_id):
+    """Extract text from an uploaded image and return the text found by each method"""
+    processed_image = ProcessedImage.objects.get(id=image_id)
+    try:
+        logger.info("Starting text extraction...")
+        return get_text_extractor().extract_all_text_bytes(_read_original(processed_image))
+    except Exception as e:
+        logger.error("Error extracting text for image %s: %s", image_id, e)
+        _mark_failed(image_id)
+        raise
+
+
+@shared_task(base=_ImageTask)
+def remove_background_task(image_id):
+    """Remove the background of an uploaded image and return the stored file name"""
+    processed_image = ProcessedImage.objects.get(id=image_id)
+    try:
+        logger.info("Starting background removal...")
+        result = get_background_remover().remove_background_bytes(_read_original(processed_image))
+        if result is None:
+            return None
+        
+        # Store the file without saving the row; finalize writes all fields at once
+        name = os.path.splitext(os.path.basename(processed_image.original_image.name))[0]
+        processed_image.processed_image.save(f'{name}_no_bg.png', ContentFile(result), save=False)
+        return processed_image.processed_image.name
+    except Exception as e:
+        logger.error("Error removing background for image %s: %s", image_id, e)
+        _mark_failed(image_id)
+        raise
+
+
+@shared_task
+def finalize_processing_task(results, image_id):
+    """Write the text and background removal results back in a single update"""
+    text_results, processed_image_name = results
+    processed_image = ProcessedImage.objects.get(id=image_id)
+    processed_image.text_results = text_results
+    processed_image.extracted_text = text_results.get('combined_text', '')
+    if processed_image_name:
+        processed_image.processed_image.name = processed_image_name
+    processed_image.status = ProcessedImage.STATUS_COMPLETED
+    processed_image.save(update_fields=['text_results', 'extracted_text', 'processed_image', 'status'])
+    _notify_done(image_id, processed_image.status)
+    
+    # Both extractors have read the original, so it no longer needs to stay in memory
+    _drop_page_cache(processed_image.original_image)
+    return processed_image.id
+
+
+def _chord_task_ids(task_id):
+    """Return the ids of the text, background and finalize tasks queued under task_id"""
+    return f'{task_id}-text', f'{task_id}-background', task_id
+
+
+def queued_task_states(task_id):
+    """Return the Celery states of the text, background and finalize tasks queued under task_id"""
+    return tuple(finalize_processing_task.AsyncResult(id).state for id in _chord_task_ids(task_id))
+
+
+def process_image(image_id):
+    """Queue text extraction and background removal to run in parallel on workers"""
+    # Ids are chosen up front so the row records them in the same update as its status
+    task_id = uuid()
+    text_task_id, background_task_id, _ = _chord_task_ids(task_id)
+    ProcessedImage.objects.filter(id=image_id).update(
+        status=ProcessedImage.STATUS_PROCESSING,
+        queued_at=timezone.now(),
+        task_id=task_id
+    )
+    try:
+        return chord(
+            [
+                extract_text_task.s(image_id).set(task_id=text_task_id),
+                remove_background_task.s(image_id).set(task_id=background_task_id)
+            ],
+            finalize_processing_task.s(image_id).set(task_id=task_id)
+        ).delay()
+    except Exception:
+        # Nothing was queued, so a later upload of the same image must be able to retry it
+        _mark_failed(image_id)
+        raise
@@ -4,6 +4,9 @@ Tests for image processing application
 from django.test import TestCase, Client
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
+from unittest import mock
+from image_extractor.celery import app as celery_app
+import io
 import json
 import os
 from PIL import Image
@@ -17,6 +20,9 @@ class ImageProcessingTestCase(TestCase):
         """Set up test data"""
         self.client = Client()
         self.test_image_path = self.create_test_image()
+        # Run background tasks inline instead of sending them to a broker, for this test only
+        self.addCleanup(setattr, celery_app.conf, 'task_always_eager', celery_app.conf.task_always_eager)
+        celery_app.conf.task_always_eager = True
     
     def create_test_image(self):
         """Create a test image for testing"""
@@ -46,10 +52,105 @@ class ImageProcessingTestCase(TestCase):
                 'image': img_file
             })
         
-        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.status_code, 202)
         data = json.loads(response.content)
         self.assertTrue(data['success'])
         self.assertIn('image_id', data)
+        self.assertIn('task_id', data)
+    
+    def test_process_image_api_reuses_identical_upload(self):
+        """Test that uploading the same image twice reuses the first result"""
+        image_ids = []
+        for _ in range(2):
+            with open(self.test_image_path, 'rb') as img_file:
+                response = self.client.post('/api/process-image/', {
+                    'image': img_file
+                })
+            self.assertIn(response.status_code, [200, 202])
+            image_ids.append(json.loads(response.content)['image_id'])
+        
+        self.assertEqual(image_ids[0], image_ids[1])
+    
+    def test_process_image_api_retries_after_failed_enqueue(self):
+        """Test that an upload whose task could not be queued is queued again on re-upload"""
+        from image_processing.models import ProcessedImage
+        
+        with mock.patch('image_processing.tasks.chord', side_effect=ConnectionError('broker down')):
+            with open(self.test_image_path, 'rb') as img_file:
+                response = self.client.post('/api/process-image/', {
+                    'image': img_file
+                })
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(ProcessedImage.objects.get().status, ProcessedImage.STATUS_FAILED)
+        
+        with open(self.test_image_path, 'rb') as img_file:
+            response = self.client.post('/api/process-image/', {
+                'image': img_file
+            })
+        self.assertEqual(response.status_code, 202)
+        self.assertIsNotNone(json.loads(response.content)['task_id'])
+    
+    def test_process_image_api_requeues_only_lost_or_failed_tasks(self):
+        """Test that re-uploads of an image still processing are queued again only when its tasks were lost or failed"""
+        import hashlib
+        from datetime import timedelta
+        from django.test import override_settings
+        from django.utils import timezone
+        from image_processing.models import ProcessedImage
+        
+        with open(self.test_image_path, 'rb') as img_file:
+            digest = hashlib.sha256(img_file.read()).hexdigest()
+        processed_image = ProcessedImage.objects.create(
+            original_image='original_images/test.jpg',
+            content_sha256=digest,
+            status=ProcessedImage.STATUS_PROCESSING,
+            task_id='earlier-task'
+        )
+        cases = [
+            # (task states, minutes since queued, queued again)
+            (('PENDING', 'PENDING', 'PENDING'), 30, False),
+            (('PENDING', 'PENDING', 'PENDING'), 120, True),
+            (('STARTED', 'PENDING', 'PENDING'), 120, False),
+            (('FAILURE', 'SUCCESS', 'PENDING'), 1, True),
+        ]
+        for task_states, minutes, requeued in cases:
+            with self.subTest(task_states=task_states, minutes=minutes):
+                ProcessedImage.objects.filter(id=processed_image.id).update(
+                    status=ProcessedImage.STATUS_PROCESSING,
+                    queued_at=timezone.now() - timedelta(minutes=minutes),
+                    task_id='earlier-task'
+                )
+                with override_settings(PROCESSING_STALE_SECONDS=3600), \
+                        mock.patch('image_processing.views.queued_task_states', return_value=task_states), \
+                        mock.patch('image_processing.tasks.chord') as chord:
+                    chord.return_value.delay.return_value.id = 'new-task'
+                    with open(self.test_image_path, 'rb') as img_file:
+                        response = self.client.post('/api/process-image/', {
+                            'image': img_file
+                        })
+                
+                self.assertEqual(response.status_code, 202)
+                self.assertEqual(chord.called, requeued)
+                self.assertEqual(json.loads(response.content)['task_id'], 'new-task' if requeued else None)
+    
+    def test_processing_status_api(self):
+        """Test processing status API"""
+        with open(self.test_image_path, 'rb') as img_file:
+            response = self.client.post('/api/process-image/', {
+                'image': img_file
+            })
+        image_id = json.loads(response.content)['image_id']
+        
+        response = self.client.get(f'/api/status/{image_id}/')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertTrue(data['success'])
+        self.assertIn(data['status'], ['completed', 'failed'])
+    
+    def test_processing_status_api_not_found(self):
+        """Test processing status API with an unknown image"""
+        response = self.client.get('/api/status/999999/')
+        self.assertEqual(response.status_code, 404)
     
     def test_process_image_api_no_file(self):
         """Test image processing API without file"""
@@ -58,6 +159,14 @@ class ImageProcessingTestCase(TestCase):
         data = json.loads(response.content)
         self.assertIn('error', data)
     
+    def test_process_image_api_rejects_non_image(self):
+        """Test image processing API with a file that only claims to be an image"""
+        fake_image = SimpleUploadedFile('fake.jpg', b'not an image', content_type='image/jpeg')
+        response = self.client.post('/api/process-image/', {'image': fake_image})
+        self.assertEqual(response.status_code, 400)
+        data = json.loads(response.content)
+        self.assertIn('error', data)
+    
     def test_extract_attributes_api(self):
         """Test attribute extraction API"""
         data = {
@@ -88,6 +197,37 @@ class ImageProcessingTestCase(TestCase):
         data = json.loads(response.content)
         self.assertIn('error', data)
     
+    def test_product_attributes_round_trip(self):
+        """Test that product attributes read back unchanged through update() and values()"""
+        from image_processing.models import ProcessedImage
+        
+        attributes = {'price': '$19.99', 'dimensions': ['10', '20', '5'], 'colors': ['red']}
+        processed_image = ProcessedImage.objects.create(original_image='original_images/test.jpg')
+        rows = ProcessedImage.objects.filter(id=processed_image.id)
+        rows.update(product_attributes=attributes)
+        
+        self.assertEqual(rows.values('product_attributes').get()['product_attributes'], attributes)
+        processed_image.refresh_from_db()
+        self.assertEqual(processed_image.product_attributes, attributes)
+    
+    def test_product_attributes_reads_legacy_json(self):
+        """Test that rows written while product_attributes was a JSONField still load"""
+        from django.db import connection
+        from image_processing.models import ProcessedImage
+        
+        processed_image = ProcessedImage.objects.create(original_image='original_images/test.jpg')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {ProcessedImage._meta.db_table} SET product_attributes = %s WHERE id = %s',
+                ['{"brand": "Acme"}', processed_image.id]
+            )
+        
+        rows = ProcessedImage.objects.filter(id=processed_image.id)
+        self.assertEqual(rows.values('product_attributes').get()['product_attributes'], {'brand': 'Acme'})
+        response = self.client.get('/api/history/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['history'][0]['product_attributes'], {'brand': 'Acme'})
+    
     def test_get_history_api(self):
         """Test get history API"""
         response = self.client.get('/api/history/')
@@ -96,6 +236,35 @@ class ImageProcessingTestCase(TestCase):
         self.assertTrue(data['success'])
         self.assertIn('history', data)
     
+    def test_get_history_api_newest_first(self):
+        """Test that history returns the latest 50 images, newest first"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from image_processing.models import ProcessedImage
+        
+        now = timezone.now()
+        ProcessedImage.objects.bulk_create([
+            ProcessedImage(original_image=f'original_images/{i}.jpg', created_at=now - timedelta(minutes=i))
+            for i in range(55)
+        ])
+        
+        response = self.client.get('/api/history/')
+        history = json.loads(response.content)['history']
+        self.assertEqual(len(history), 50)
+        self.assertTrue(history[0]['original_image_url'].endswith('original_images/0.jpg'))
+        created = [item['created_at'] for item in history]
+        self.assertEqual(created, sorted(created, reverse=True))
+    
+    def test_history_media_url_matches_storage_url(self):
+        """Test that history URLs use the storage's own base URL"""
+        from django.core.files.storage import FileSystemStorage
+        from image_processing import views
+        
+        storage = FileSystemStorage(base_url='https://cdn.example.com/uploads/')
+        with mock.patch.object(views, 'default_storage', storage):
+            url = views._media_url('original_images/red shoe.jpg')
+        self.assertEqual(url, storage.url('original_images/red shoe.jpg'))
+    
     def test_text_extractor_import(self):
         """Test that text extractor can be imported"""
         try:
@@ -129,8 +298,68 @@ class TextExtractorTestCase(TestCase):
     
     def setUp(self):
         """Set up test data"""
-        from image_processing.text_extractor import TextExtractor
-        self.extractor = TextExtractor()
+        from image_processing.text_extractor import get_text_extractor
+        self.extractor = get_text_extractor()
+    
+    def test_extract_all_attributes_skips_cache_when_categorization_fails(self):
+        """Test that results without a category are not cached"""
+        from image_processing.attribute_extractor import ProductAttributeExtractor
+        extractor = ProductAttributeExtractor()
+        extractor._classifier_batcher = mock.Mock()
+        extractor._classifier_batcher.submit.side_effect = RuntimeError('model unavailable')
+        
+        attributes = extractor.extract_all_attributes(title="Steel water bottle")
+        self.assertNotIn('category', attributes)
+        extractor.extract_all_attributes(title="Steel water bottle")
+        
+        self.assertEqual(extractor._classifier_batcher.submit.call_count, 2)
+    
+    def test_classifier_load_failure_is_not_retried_immediately(self):
+        """Test that a failed model load is remembered instead of retried on every request"""
+        from image_processing.attribute_extractor import ProductAttributeExtractor
+        extractor = ProductAttributeExtractor()
+        
+        with mock.patch(
+            'image_processing.attribute_extractor.AutoTokenizer.from_pretrained',
+            side_effect=OSError('hub unreachable')
+        ) as from_pretrained:
+            with self.assertRaises(OSError):
+                extractor.warm()
+            with self.assertRaises(RuntimeError):
+                extractor.warm()
+        
+        self.assertEqual(from_pretrained.call_count, 1)
+    
+    def test_extract_ml_attributes_does_not_share_categories_between_wordless_texts(self):
+        """Test that texts without words are categorized on their own"""
+        from image_processing.attribute_extractor import ProductAttributeExtractor
+        extractor = ProductAttributeExtractor()
+        extractor._classifier_batcher = mock.Mock()
+        extractor._classifier_batcher.submit.return_value.result.return_value = {
+            'labels': ['Toys'], 'scores': [0.5]
+        }
+        
+        extractor.extract_ml_attributes("---")
+        extractor.extract_ml_attributes("***")
+        
+        self.assertEqual(extractor._classifier_batcher.submit.call_count, 2)
+    
+    def test_micro_batcher_fails_items_without_results(self):
+        """Test that a batch function returning too few results fails the batch instead of hanging"""
+        from image_processing.attribute_extractor import _MicroBatcher
+        batcher = _MicroBatcher(lambda items: items[:-1], max_batch_size=4, max_wait=0.01)
+        
+        with self.assertRaises(RuntimeError):
+            batcher.submit('text').result(timeout=5)
+    
+    def test_load_image_decodes_gif_bytes(self):
+        """Test that GIF uploads, which OpenCV cannot decode, are read through PIL"""
+        buffer = io.BytesIO()
+        Image.new('RGB', (40, 30), color='white').save(buffer, 'GIF')
+        
+        img, gray = self.extractor._load_image(buffer.getvalue())
+        self.assertEqual(img.shape, (30, 40, 3))
+        self.assertEqual(gray.shape, (30, 40))
     
     def test_extract_basic_attributes(self):
         """Test basic attribute extraction"""
@@ -145,6 +374,39 @@ class TextExtractorTestCase(TestCase):
         self.assertIn('materials', attributes)
         self.assertIn('brand', attributes)
     
+    def test_extract_basic_attributes_deduplicates_keywords(self):
+        """Test that repeated keywords are reported once"""
+        from image_processing.attribute_extractor import ProductAttributeExtractor
+        extractor = ProductAttributeExtractor()
+        
+        test_text = "Red leather wallet, RED stitching, genuine Leather"
+        attributes = extractor.extract_basic_attributes(test_text)
+        
+        self.assertEqual(attributes['colors'], ['red'])
+        self.assertEqual(attributes['materials'], ['leather'])
+    
+    def test_extract_basic_attributes_pattern_priority(self):
+        """Test that earlier patterns win over later ones wherever they match in the text"""
+        from image_processing.attribute_extractor import ProductAttributeExtractor
+        extractor = ProductAttributeExtractor()
+        
+        dimensions = extractor.extract_basic_attributes("Size: 10 x 20 x 5 cm")
+        self.assertEqual(dimensions['dimensions'], ('10', '20', '5'))
+        
+        weight = extractor.extract_basic_attributes("Weight: 5 lb (2.3 kg)")
+        self.assertEqual(weight['weight'], '2.3')
+    
+    def test_attribute_patterns_compile_with_re2(self):
+        """Test that the attribute patterns work with google-re2 when it is installed"""
+        try:
+            import re2
+        except ImportError:
+            self.skipTest('google-re2 is not installed')
+        from image_processing import attribute_extractor
+        
+        self.assertIs(attribute_extractor.regex_engine, re2)
+        self.assertEqual(attribute_extractor._WEIGHT_PATTERNS.search('Weighs 2 KG'), '2')
+    
     def test_extract_ml_attributes(self):
         """Test ML-based attribute extraction"""
         from image_processing.attribute_extractor import ProductAttributeExtractor
@@ -155,3 +417,21 @@ class TextExtractorTestCase(TestCase):
         
         # Should have some attributes extracted
         self.assertIsInstance(attributes, dict)
+    
+    def test_extract_all_attributes_returns_cached_copy(self):
+        """Test that repeated extractions reuse the cached result without sharing it"""
+        from image_processing.attribute_extractor import ProductAttributeExtractor
+        extractor = ProductAttributeExtractor()
+        # Only categorized results are cached, so stand in for the model
+        extractor._classifier_batcher = mock.Mock()
+        extractor._classifier_batcher.submit.return_value.result.return_value = {
+            'labels': ['Clothing'], 'scores': [0.9]
+        }
+        
+        first = extractor.extract_all_attributes(title="Blue Cotton Shirt", description="Price: 20")
+        first['colors'].append('green')
+        second = extractor.extract_all_attributes(title="Blue Cotton Shirt", description="Price: 20")
+        
+        self.assertEqual(second['colors'], ['blue'])
+        self.assertEqual(second['category'], 'Clothing')
+        extractor._classifier_batcher.submit.assert_called_once()
@@ -5,10 +5,37 @@ import cv2
 import numpy as np
 import pytesseract
 import easyocr
+import torch
 from PIL import Image
+import io
 import os
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from django.conf import settings
 
+try:
+    # tesserocr keeps Tesseract in-process, avoiding a subprocess per OCR call
+    from tesserocr import PyTessBaseAPI
+except ImportError:
+    PyTessBaseAPI = None
+
+logger = logging.getLogger(__name__)
+
+# OCR accuracy plateaus well below phone-camera resolutions, so larger
+# images are downscaled to this long side before any extractor runs
+_OCR_MAX_SIDE = 1600
+
+
+# cv2.rotate codes for counterclockwise rotations by right angles
+_ROTATE_CODES = {
+    90: cv2.ROTATE_90_COUNTERCLOCKWISE,
+    180: cv2.ROTATE_180,
+    270: cv2.ROTATE_90_CLOCKWISE,
+}
+
 
 class TextExtractor:
     """Class for extracting text from images with different orientations"""
@@ -18,16 +45,48 @@ class TextExtractor:
         if hasattr(settings, 'TESSERACT_CMD'):
             pytesseract.pytesseract.tesseract_cmd = settings.TESSERACT_CMD
         
-        # Initialize EasyOCR reader
-        self.easyocr_reader = easyocr.Reader(['en'])
+        # Initialize EasyOCR reader, on the GPU when one is available
+        self.easyocr_reader = easyocr.Reader(['en'], gpu=torch.cuda.is_available(), quantize=True)
+        
+        # Decoded arrays of the image being processed, shared by all extractors
+        self._image_lock = threading.Lock()
+        self._image_source = None
+        self._image = None
+    
+    def _load_image(self, image_path):
+        """Return the (bgr, gray) arrays for an image path or encoded image bytes, decoding it only once"""
+        with self._image_lock:
+            if self._image_source != image_path:
+                if isinstance(image_path, bytes):
+                    img = cv2.imdecode(np.frombuffer(image_path, np.uint8), cv2.IMREAD_COLOR)
+                else:
+                    img = cv2.imread(image_path)
+                if img is None:
+                    # OpenCV cannot decode some accepted formats such as GIF, PIL can
+                    source = io.BytesIO(image_path) if isinstance(image_path, bytes) else image_path
+                    with Image.open(source) as pil_img:
+                        img = cv2.cvtColor(np.asarray(pil_img.convert('RGB')), cv2.COLOR_RGB2BGR)
+                h, w = img.shape[:2]
+                scale = min(1.0, _OCR_MAX_SIDE / max(h, w))
+                if scale < 1:
+                    img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+                    logger.debug("Downscaled image for OCR by %.3f", scale)
+                gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+                self._image = (img, gray)
+                self._image_source = image_path
+            return self._image
+    
+    def _release_image(self, image_path):
+        """Drop the cached arrays once an image has been fully processed"""
+        with self._image_lock:
+            if self._image_source == image_path:
+                self._image_source = None
+                self._image = None
     
     def preprocess_image(self, image_path):
         """Preprocess image for better OCR results"""
-        # Read image
-        img = cv2.imread(image_path)
-        
-        # Convert to grayscale
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        # Read image and convert to grayscale
+        _, gray = self._load_image(image_path)
         
         # Apply denoising
         denoised = cv2.fastNlMeansDenoising(gray)
@@ -45,16 +104,15 @@ class TextExtractor:
             # Preprocess image
             processed_img = self.preprocess_image(image_path)
             
-            # Extract text with different configurations
-            configs = [
-                '--psm 6',  # Uniform block of text
-                '--psm 3',  # Fully automatic page segmentation
-                '--psm 4',  # Assume a single column of text
+            # Extract text with different page segmentation modes
+            page_segmentation_modes = [
+                6,  # Uniform block of text
+                3,  # Fully automatic page segmentation
+                4,  # Assume a single column of text
             ]
             
             all_text = []
-            for config in configs:
-                text = pytesseract.image_to_string(processed_img, config=config)
+            for text in self._ocr_page_segmentation_modes(processed_img, page_segmentation_modes):
                 if text.strip():
                     all_text.append(text.strip())
             
@@ -63,40 +121,60 @@ class TextExtractor:
             print(f"Error in horizontal text extraction: {e}")
             return ""
     
+    def _ocr_page_segmentation_modes(self, img, modes):
+        """Run Tesseract over one image once per page segmentation mode"""
+        if PyTessBaseAPI is not None:
+            texts = []
+            pil_img = Image.fromarray(img)
+            with PyTessBaseAPI() as api:
+                for mode in modes:
+                    api.SetPageSegMode(mode)
+                    # Setting the image clears the previous recognition result
+                    api.SetImage(pil_img)
+                    texts.append(api.GetUTF8Text())
+            return texts
+        
+        # Encode the image once and point every Tesseract run at the same file
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            img_path = os.path.join(tmp_dir, 'ocr_input.png')
+            cv2.imwrite(img_path, img)
+            return [
+                pytesseract.image_to_string(img_path, config=f'--psm {mode}')
+                for mode in modes
+            ]
+    
     def extract_vertical_text(self, image_path):
         """Extract vertical text by rotating image"""
         try:
             # Read and preprocess image
-            img = cv2.imread(image_path)
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            _, gray = self._load_image(image_path)
             
-            # Try different rotations
+            # Try different rotations concurrently, each runs its own Tesseract process
             rotations = [90, 180, 270]
-            all_text = []
-            
-            for angle in rotations:
-                # Rotate image
-                (h, w) = gray.shape[:2]
-                center = (w // 2, h // 2)
-                M = cv2.getRotationMatrix2D(center, angle, 1.0)
-                rotated = cv2.warpAffine(gray, M, (w, h))
-                
-                # Extract text
-                text = pytesseract.image_to_string(rotated, config='--psm 6')
-                if text.strip():
-                    all_text.append(text.strip())
+            with ThreadPoolExecutor(max_workers=len(rotations)) as executor:
+                texts = executor.map(lambda angle: self._extract_rotated_text(gray, angle), rotations)
+                all_text = [text for text in texts if text]
             
             return ' '.join(all_text)
         except Exception as e:
             print(f"Error in vertical text extraction: {e}")
             return ""
     
+    def _extract_rotated_text(self, gray, angle):
+        """Rotate a grayscale image by angle degrees and extract its text"""
+        # Rotate image counterclockwise; right angles are a pure transpose/flip,
+        # so no interpolation is needed and nothing gets cropped
+        rotated = cv2.rotate(gray, _ROTATE_CODES[angle])
+        
+        # Extract text
+        text = pytesseract.image_to_string(rotated, config='--psm 6')
+        return text.strip()
+    
     def extract_embossed_text(self, image_path):
         """Extract embossed/raised text using morphological operations"""
         try:
             # Read image
-            img = cv2.imread(image_path)
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            _, gray = self._load_image(image_path)
             
             # Apply morphological operations to enhance embossed text
             kernel = np.ones((3,3), np.uint8)
@@ -125,27 +203,54 @@ class TextExtractor:
     def extract_text_easyocr(self, image_path):
         """Extract text using EasyOCR for better accuracy"""
         try:
-            results = self.easyocr_reader.readtext(image_path)
-            text_parts = []
-            
-            for (bbox, text, confidence) in results:
-                if confidence > 0.5:  # Filter low confidence results
-                    text_parts.append(text)
-            
-            return ' '.join(text_parts)
+            img, _ = self._load_image(image_path)
+            results = self.easyocr_reader.readtext(img)
+            return self._join_confident_text(results)
         except Exception as e:
             print(f"Error in EasyOCR text extraction: {e}")
             return ""
     
+    def extract_text_easyocr_batch(self, image_paths, batch_size=16, n_width=800, n_height=600):
+        """Extract text from several images using batched EasyOCR inference"""
+        try:
+            # Images are resized to a common size so they can share detector batches
+            batch_results = self.easyocr_reader.readtext_batched(
+                image_paths, n_width=n_width, n_height=n_height, batch_size=batch_size
+            )
+            return [self._join_confident_text(results) for results in batch_results]
+        except Exception as e:
+            print(f"Error in batched EasyOCR text extraction: {e}")
+            return [""] * len(image_paths)
+    
+    def _join_confident_text(self, results):
+        """Join the text of EasyOCR results, skipping low confidence ones"""
+        text_parts = []
+        
+        for (bbox, text, confidence) in results:
+            if confidence > 0.5:  # Filter low confidence results
+                text_parts.append(text)
+        
+        return ' '.join(text_parts)
+    
     def extract_all_text(self, image_path):
         """Extract all types of text from image"""
-        results = {
-            'horizontal_text': self.extract_horizontal_text(image_path),
-            'vertical_text': self.extract_vertical_text(image_path),
-            'embossed_text': self.extract_embossed_text(image_path),
-            'easyocr_text': self.extract_text_easyocr(image_path),
+        extractors = {
+            'horizontal_text': self.extract_horizontal_text,
+            'vertical_text': self.extract_vertical_text,
+            'embossed_text': self.extract_embossed_text,
+            'easyocr_text': self.extract_text_easyocr,
         }
         
+        # The extractors are independent and spend their time in Tesseract subprocesses
+        # or GIL-releasing native code, so run them concurrently
+        with ThreadPoolExecutor(max_workers=len(extractors)) as executor:
+            futures = {
+                text_type: executor.submit(extractor, image_path)
+                for text_type, extractor in extractors.items()
+            }
+            results = {text_type: future.result() for text_type, future in futures.items()}
+        self._release_image(image_path)
+        
         # Combine all text
         all_text = []
         for text_type, text in results.items():
@@ -154,3 +259,14 @@ class TextExtractor:
         
         results['combined_text'] = ' '.join(all_text)
         return results
+    
+    def extract_all_text_bytes(self, data):
+        """Extract all types of text from encoded image bytes without reading from disk"""
+        # Every extractor reads through _load_image, which decodes the bytes once
+        return self.extract_all_text(bytes(data))
+
+
+@lru_cache(maxsize=1)
+def get_text_extractor():
+    """Return the process-wide TextExtractor so OCR models are loaded once per worker"""
+    return TextExtractor()
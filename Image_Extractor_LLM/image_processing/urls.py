@@ -7,5 +7,6 @@ urlpatterns = [
     path('', views.home, name='home'),
     path('api/process-image/', views.process_image_api, name='process_image_api'),
     path('api/extract-attributes/', views.extract_attributes_api, name='extract_attributes_api'),
+    path('api/status/<int:image_id>/', views.get_processing_status, name='get_processing_status'),
     path('api/history/', views.get_processing_history, name='get_processing_history'),
 ]
@@ -1,22 +1,178 @@
 """
 Views for image processing and attribute extraction
 """
-import os
-import json
+import hashlib
+from datetime import timedelta
+import orjson
+from celery import states
+from concurrent.futures import ThreadPoolExecutor
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
 from django.conf import settings
+from django.utils import timezone
+from django.utils.encoding import filepath_to_uri
 from .models import ProcessedImage
-from .text_extractor import TextExtractor
-from .background_remover import BackgroundRemover
-from .attribute_extractor import ProductAttributeExtractor
+from .tasks import process_image, queued_task_states
+from .attribute_extractor import get_attribute_extractor
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Image types accepted for processing
+_ALLOWED_MIME = frozenset({'image/jpeg', 'image/png', 'image/jpg', 'image/gif', 'image/bmp'})
+
+# Leading bytes of each accepted image format
+_IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'BM', 'image/bmp'),
+)
+
+# Loads the attribute extractor's models while the request thread queries the database
+_prefetch_pool = ThreadPoolExecutor(max_workers=2)
+
+# How long a URL from a remote storage is reused; kept well below typical signature lifetimes
+_MEDIA_URL_TIMEOUT = 300
+
+# How long the storage name and extracted text of a processed image stay cached
+_IMAGE_META_TIMEOUT = 3600
+
+
+def _sniff_image_type(image_file):
+    """Return the image MIME type matching an upload's leading bytes, or None"""
+    image_file.seek(0)
+    header = image_file.read(16)
+    image_file.seek(0)
+    for signature, mime_type in _IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return mime_type
+    return None
+
+
+def _hash_upload(image_file):
+    """Return the SHA-256 hex digest of an upload, reading it in chunks"""
+    digest = hashlib.sha256()
+    for chunk in image_file.chunks(settings.UPLOAD_CHUNK_SIZE):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _json_response(data, status=200):
+    """Return data as a JSON response encoded with orjson"""
+    return HttpResponse(orjson.dumps(data), content_type='application/json', status=status)
+
+
+def _load_attribute_extractor():
+    """Return the shared attribute extractor, with its classifier loaded when possible"""
+    attribute_extractor = get_attribute_extractor()
+    try:
+        attribute_extractor.warm()
+    except Exception as e:
+        # Extraction still returns the regex attributes; the model is retried after a delay
+        logger.warning("Error loading attribute classifier: %s", e)
+    return attribute_extractor
+
+
+def _image_meta(image_id):
+    """Return the original image name and extracted text of an image, or None if it does not exist"""
+    key = f'processed_image_meta:{image_id}'
+    meta = cache.get(key)
+    if meta is None:
+        try:
+            processed_image = ProcessedImage.objects.only(
+                'original_image', 'extracted_text', 'status'
+            ).get(id=image_id)
+        except ProcessedImage.DoesNotExist:
+            return None
+        meta = {'name': processed_image.original_image.name, 'text': processed_image.extracted_text}
+        # Only completed images are cached, their text no longer changes
+        if processed_image.status == ProcessedImage.STATUS_COMPLETED:
+            cache.set(key, meta, _IMAGE_META_TIMEOUT)
+    return meta
+
+
+def _status_data(processed_image):
+    """Describe the processing state of an image, with its results once completed"""
+    data = {
+        'success': True,
+        'image_id': processed_image.id,
+        'status': processed_image.status,
+        'original_image_url': processed_image.original_image.url
+    }
+    
+    if processed_image.status == ProcessedImage.STATUS_COMPLETED:
+        # Rows processed before per-method results were stored only have the combined text
+        data['extracted_text'] = processed_image.text_results or {'combined_text': processed_image.extracted_text}
+        data['processed_image_url'] = (
+            processed_image.processed_image.url if processed_image.processed_image else None
+        )
+        data['product_attributes'] = processed_image.product_attributes
+    
+    return data
+
+
+def _needs_processing(processed_image):
+    """Whether an earlier upload of the same image has to be queued again instead of reused"""
+    if processed_image.status == ProcessedImage.STATUS_FAILED:
+        return True
+    if processed_image.status == ProcessedImage.STATUS_COMPLETED:
+        return False
+    if processed_image.task_id:
+        text_state, background_state, finalize_state = queued_task_states(processed_image.task_id)
+        if finalize_state in states.READY_STATES or {text_state, background_state} & states.PROPAGATE_STATES:
+            # The tasks finished or failed without the row recording it
+            return True
+        if {text_state, background_state, finalize_state} - {states.PENDING, states.SUCCESS}:
+            # A task is running or waiting to retry
+            return False
+    # Tasks still pending may just be waiting behind a backlog, so only a long wait means they were lost
+    queued_at = processed_image.queued_at or processed_image.created_at
+    return queued_at < timezone.now() - timedelta(seconds=settings.PROCESSING_STALE_SECONDS)
+
+
+def _ws_path(image_id):
+    """Return the WebSocket path that announces when an image has been processed"""
+    return f'/ws/image/{image_id}/'
+
+
+def _existing_image_response(processed_image):
+    """Respond to an upload that matches an image which was already queued or processed"""
+    status = 200 if processed_image.status == ProcessedImage.STATUS_COMPLETED else 202
+    data = dict(_status_data(processed_image), task_id=None, ws=_ws_path(processed_image.id))
+    return _json_response(data, status=status)
+
+
+def _media_url(name):
+    """Return the URL of a stored file without asking a remote storage to sign it on every call"""
+    if isinstance(default_storage, FileSystemStorage):
+        # Same URL as FileSystemStorage.url(), whose base_url may differ from MEDIA_URL
+        return f"{default_storage.base_url}{filepath_to_uri(name).lstrip('/')}"
+    
+    key = f'media_url:{name}'
+    url = cache.get(key)
+    if url is None:
+        url = default_storage.url(name)
+        cache.set(key, url, _MEDIA_URL_TIMEOUT)
+    return url
+
+
+def _history_item(row):
+    """Describe one processing history row"""
+    return {
+        'id': row['id'],
+        'original_image_url': _media_url(row['original_image']),
+        'processed_image_url': _media_url(row['processed_image']) if row['processed_image'] else None,
+        'extracted_text': row['extracted_text'],
+        'product_attributes': row['product_attributes'],
+        'created_at': row['created_at']
+    }
+
 
 def home(request):
     """Home page with image upload interface"""
@@ -36,56 +192,48 @@ def process_image_api(request):
         
         image_file = request.FILES['image']
         
-        # Validate file type
-        allowed_types = ['image/jpeg', 'image/png', 'image/jpg', 'image/gif', 'image/bmp']
-        if image_file.content_type not in allowed_types:
-            return JsonResponse({'error': 'Invalid file type. Only images are allowed.'}, status=400)
-        
-        # Save original image
-        processed_image = ProcessedImage(original_image=image_file)
-        processed_image.save()
+        # Reject oversized uploads before reading them
+        if image_file.size > settings.MAX_UPLOAD_BYTES:
+            return JsonResponse({'error': 'File too large.'}, status=413)
         
-        # Get file path
-        image_path = processed_image.original_image.path
-        
-        # Initialize extractors
-        text_extractor = TextExtractor()
-        background_remover = BackgroundRemover()
-        
-        # Extract text from image
-        logger.info("Starting text extraction...")
-        text_results = text_extractor.extract_all_text(image_path)
+        # Validate file type, both as declared by the client and by the file's contents
+        if image_file.content_type not in _ALLOWED_MIME or _sniff_image_type(image_file) not in _ALLOWED_MIME:
+            return JsonResponse({'error': 'Invalid file type. Only images are allowed.'}, status=400)
         
-        # Remove background
-        logger.info("Starting background removal...")
-        processed_image_path = background_remover.remove_background(image_path)
+        digest = _hash_upload(image_file)
         
-        # Update processed image
-        if processed_image_path and os.path.exists(processed_image_path):
-            with open(processed_image_path, 'rb') as f:
-                processed_image.processed_image.save(
-                    os.path.basename(processed_image_path),
-                    ContentFile(f.read()),
-                    save=True
-                )
+        # Byte-identical uploads reuse the earlier row instead of being processed again
+        processed_image = ProcessedImage.objects.filter(content_sha256=digest).first()
+        if processed_image is None:
+            # Save original image; storage copies the upload in chunks rather than reading it whole
+            processed_image = ProcessedImage(original_image=image_file, content_sha256=digest)
+            try:
+                with transaction.atomic():
+                    processed_image.save()
+            except IntegrityError:
+                # A concurrent request saved the same upload first, so share its task
+                processed_image.original_image.delete(save=False)
+                return _existing_image_response(ProcessedImage.objects.get(content_sha256=digest))
+        elif not _needs_processing(processed_image):
+            return _existing_image_response(processed_image)
         
-        # Save extracted text
-        processed_image.extracted_text = text_results.get('combined_text', '')
-        processed_image.save()
+        # Queue text extraction and background removal on a worker
+        result = process_image(processed_image.id)
         
         # Prepare response
         response_data = {
             'success': True,
             'image_id': processed_image.id,
-            'extracted_text': text_results,
-            'processed_image_url': processed_image.processed_image.url if processed_image.processed_image else None,
-            'original_image_url': processed_image.original_image.url
+            'task_id': result.id,
+            'status': ProcessedImage.STATUS_PROCESSING,
+            'original_image_url': processed_image.original_image.url,
+            'ws': _ws_path(processed_image.id)
         }
         
-        return JsonResponse(response_data)
+        return JsonResponse(response_data, status=202)
         
     except Exception as e:
-        logger.error(f"Error processing image: {str(e)}")
+        logger.error("Error processing image: %s", e)
         return JsonResponse({'error': f'Error processing image: {str(e)}'}, status=500)
 
 
@@ -96,7 +244,7 @@ def extract_attributes_api(request):
         return JsonResponse({'error': 'Only POST method allowed'}, status=405)
     
     try:
-        data = json.loads(request.body)
+        data = orjson.loads(request.body)
         
         # Get parameters
         title = data.get('title', '')
@@ -104,19 +252,21 @@ def extract_attributes_api(request):
         image_id = data.get('image_id')
         image_path = None
         
+        # Load the extractor in the background while the image is looked up
+        extractor_future = _prefetch_pool.submit(_load_attribute_extractor)
+        
         # Get image path if image_id is provided
         if image_id:
-            try:
-                processed_image = ProcessedImage.objects.get(id=image_id)
-                image_path = processed_image.original_image.path
-                # Use extracted text if available
-                if processed_image.extracted_text:
-                    description = f"{description} {processed_image.extracted_text}".strip()
-            except ProcessedImage.DoesNotExist:
+            meta = _image_meta(image_id)
+            if meta is None:
                 return JsonResponse({'error': 'Image not found'}, status=404)
+            image_path = default_storage.path(meta['name'])
+            # Use extracted text if available
+            if meta['text']:
+                description = f"{description} {meta['text']}".strip()
         
-        # Initialize attribute extractor
-        attribute_extractor = ProductAttributeExtractor()
+        # Get the shared attribute extractor
+        attribute_extractor = extractor_future.result()
         
         # Extract attributes
         logger.info("Starting attribute extraction...")
@@ -128,8 +278,7 @@ def extract_attributes_api(request):
         
         # Update processed image if image_id is provided
         if image_id:
-            processed_image.product_attributes = attributes
-            processed_image.save()
+            ProcessedImage.objects.filter(id=image_id).update(product_attributes=attributes)
         
         # Prepare response
         response_data = {
@@ -138,34 +287,38 @@ def extract_attributes_api(request):
             'image_id': image_id
         }
         
-        return JsonResponse(response_data)
+        return _json_response(response_data)
         
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         return JsonResponse({'error': 'Invalid JSON data'}, status=400)
     except Exception as e:
-        logger.error(f"Error extracting attributes: {str(e)}")
+        logger.error("Error extracting attributes: %s", e)
         return JsonResponse({'error': f'Error extracting attributes: {str(e)}'}, status=500)
 
 
+def get_processing_status(request, image_id):
+    """API endpoint for polling the processing status of an image"""
+    try:
+        processed_image = ProcessedImage.objects.get(id=image_id)
+    except ProcessedImage.DoesNotExist:
+        return JsonResponse({'error': 'Image not found'}, status=404)
+    
+    return _json_response(_status_data(processed_image))
+
+
 def get_processing_history(request):
     """API endpoint for getting processing history"""
     try:
-        # Get all processed images
-        processed_images = ProcessedImage.objects.all()[:50]  # Limit to last 50
-        
-        history = []
-        for img in processed_images:
-            history.append({
-                'id': img.id,
-                'original_image_url': img.original_image.url,
-                'processed_image_url': img.processed_image.url if img.processed_image else None,
-                'extracted_text': img.extracted_text,
-                'product_attributes': img.product_attributes,
-                'created_at': img.created_at.isoformat()
-            })
-        
-        return JsonResponse({'success': True, 'history': history})
+        # Fetch plain rows newest first, so no model instances or FieldFiles are built
+        rows = ProcessedImage.objects.order_by('-created_at').values(
+            'id', 'original_image', 'processed_image', 'extracted_text', 'product_attributes', 'created_at'
+        )[:50]  # Limit to last 50
+        
+        # Build the whole payload here, so query and encoding errors still get the 500 below;
+        # the rows are fetched from the cursor 25 at a time
+        history = [_history_item(row) for row in rows.iterator(chunk_size=25)]
+        return _json_response({'success': True, 'history': history})
         
     except Exception as e:
-        logger.error(f"Error getting processing history: {str(e)}")
+        logger.error("Error getting processing history: %s", e)
         return JsonResponse({'error': f'Error getting processing history: {str(e)}'}, status=500)